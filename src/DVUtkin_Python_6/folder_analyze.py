@@ -8,47 +8,72 @@
 """
 
 import argparse
+import codecs
 import csv
+import io
 import json
+import os
+import re
+import shutil
+import stat
+import tempfile
 import zipfile
-from datetime import datetime
-from io import BytesIO
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from functools import lru_cache
 from pathlib import Path
+from time import localtime
+from typing import IO
+from xml.sax.saxutils import escape
 
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
 from openpyxl import Workbook
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
 from reportlab.platypus import Indenter, Paragraph, SimpleDocTemplate, Spacer
 
+# Регистрируем шрифт DejaVuSerif один раз при импорте. Если файла шрифта нет,
+# импорт не падает: ошибка будет выдана при записи отчёта в PDF
+with suppress(TTFError):
+    pdfmetrics.registerFont(TTFont('DejaVuSerif', 'DejaVuSerif.ttf', 'UTF-8'))
+
 
 class Item:
     """Класс для элемента отчёта (объект: файл, папка или архив).
 
     Атрибуты:
         path (str): Путь к объекту в виде строки.
-        size (int): Размер объекта (для файла, для папки - слово FOLDER, для ZIP-архивов - слово ZIP).
-        time (datetime): Время изменения.
+        size (str): Размер объекта (для файла, для папки - слово FOLDER, для ZIP-архивов - слово ZIP).
+        time (str): Время изменения.
         level (int): Уровень вложенности объекта (для красивого вывода).
     """
 
-    def __init__(self, root_path:str, path:str, size:int, time:datetime):
+    # Без __dict__ у каждого экземпляра: заметная экономия памяти на больших папках
+    __slots__ = ('path', 'level', 'name', 'size', 'time', '_str')
+
+    def __init__(self, path:str, name:str, level:int, size:int | str, time:str | tuple[int, ...]):
         """Конструктор класса Item.
 
         Args:
-            root_path (str): Путь к анализируемой скриптом папке (из параметра --path командной строки).
             path (str): Путь к файлу/папке в виде строки.
-            size (int): Размер файла (для файла, для папки - слово FOLDER, для ZIP-архивов - слово ZIP).
-            time (datetime): Время изменения.
+            name (str): Имя файла/папки.
+            level (int): Уровень вложенности (известен при обходе папки или архива).
+            size (int | str): Размер файла (для файла, для папки - слово FOLDER, для ZIP-архивов - слово ZIP).
+            time (str | tuple[int, ...]): Время изменения (строка для объектов папки,
+                кортеж ZipInfo.date_time для объектов zip-архива).
         """
         self.path = str(path)
-        self.level = self.path.count('\\') - str(root_path).count('\\') - 1
-        # Имя достаём из пути после последнего знака '\'
-        self.name = self.path.split('\\')[-1]
+        self.level = level
+        self.name = name
         self.size = str(size)
         self.time = str(time)
+        # Строковое представление собираем один раз: его используют несколько отчётов
+        self._str = f'{" " * (level * 5)}{name}     {self.size}     {self.time}'
 
     def __str__(self):
         """Строковое представление экземпляра Item.
@@ -56,121 +81,284 @@ class Item:
         Returns:
             str: Строка формата "уровень {имя файла} {размер файла} {дата изменения}".
         """
-        result = ' ' * (self.level*5) + '' + self.name
-        result += ' ' * 5 + '' + self.size
-        result += ' ' * 5 + '' + self.time
-        return result
+        return self._str
+
+
+# Вложенные сжатые zip-архивы до этого размера распаковываются в память, больше - во временный файл
+_ZIP_SPOOL_SIZE = 64 * 1024 * 1024
+
+
+@contextmanager
+def _open_nested_zip(zipf:zipfile.ZipFile, info:zipfile.ZipInfo) -> Iterator[IO[bytes]]:
+    """Открытие вложенного zip-архива для чтения.
 
+    Несжатый (ZIP_STORED) архив читается прямо из потока родительского архива.
+    Сжатый архив сначала распаковывается в SpooledTemporaryFile: при чтении
+    zipfile много раз перемещается по файлу назад, а каждое такое перемещение
+    в сжатом потоке заново распаковывает его с начала.
 
-def analyze_zip(root:Path, zipf: zipfile.ZipFile, zip_root:Path) -> list[Item]:
+    Args:
+        zipf (zipfile.ZipFile): Открытый родительский zip-архив.
+        info (zipfile.ZipInfo): Описание вложенного zip-архива.
+
+    Yields:
+        IO[bytes]: Файловый объект с произвольным доступом к вложенному архиву.
+    """
+    if info.compress_type == zipfile.ZIP_STORED:
+        with zipf.open(info) as inner_file:
+            yield inner_file
+    else:
+        with tempfile.SpooledTemporaryFile(max_size=_ZIP_SPOOL_SIZE) as spooled:
+            with zipf.open(info) as inner_file:
+                shutil.copyfileobj(inner_file, spooled)
+            spooled.seek(0)
+            yield spooled
+
+
+def analyze_zip(zip_level:int, zipf: zipfile.ZipFile, zip_root:Path) -> Iterator[Item]:
     """Функция для анализа zip-архива.
 
     Args:
-        root (Path): Путь к анализируемой скриптом папке (из параметра --path командной строки).
+        zip_level (int): Уровень вложенности текущего zip-архива.
         zipf (zipfile.ZipFile): Открытый текущий zip-архив.
         zip_root (Path): Путь к текущему zip-архиву.
 
-    Returns:
-        list[Item]: Список элементов отчёта (объект: файл, папка или архив). 
+    Yields:
+        Item: Элементы отчёта (объект: файл, папка или архив).
     """
-    items = []
-    
     # Проходимся по всем объектам в zip-архиве и добавляем их в отчёт
-    for f_name in zipf.infolist():
-        path = zip_root.joinpath(f_name.filename)
-        size = f_name.file_size
-        time = f_name.date_time
+    # (сортируем по частям имени: получается тот же порядок дерева, что и для папок)
+    for info in sorted(zipf.infolist(), key=lambda x: x.filename.lower().split('/')):
+        # Атрибуты ZipInfo читаем один раз
+        name = info.filename
+        path = zip_root.joinpath(name)
+        size = info.file_size
+        time = info.date_time
+        parts = name.rstrip('/').split('/')
+        # Уровень вложенности: уровень архива плюс число частей имени внутри архива
+        level = zip_level + len(parts)
 
         # Если имя файла (из infolist()) заказчивается на '/' - это папка
-        if f_name.filename.endswith('/'):
+        is_folder = name.endswith('/')
+        # Если имя файла заканчивается на '.zip' - это zip-архив
+        is_zip = not is_folder and name.lower().endswith('.zip')
+
+        if is_folder:
             size = 'FOLDER'
 
-        # Если имя файла заканчивается на '.zip' - это zip-архив
-        if path.suffix.lower() == '.zip':
-            size = 'ZIP'
-            # Открываем и читаем вложенный zip-архив
-            with zipf.open(f_name) as inner_file:
-                data = inner_file.read()
-                with zipfile.ZipFile(BytesIO(data)) as nested_zip:
-                    # Запускаем analyze_zip рекурсивно для анализа вложенного zip-архива
-                    items.extend(analyze_zip(root, nested_zip, path))
-        
+        if is_zip:
+            # Добавляем архив в отчёт перед его содержимым
+            yield Item(str(path), parts[-1], level, 'ZIP', time)
+            # Открываем вложенный zip-архив (без чтения в память целиком, см. _open_nested_zip)
+            with _open_nested_zip(zipf, info) as nested_file, zipfile.ZipFile(nested_file) as nested_zip:
+                # Запускаем analyze_zip рекурсивно для анализа вложенного zip-архива
+                yield from analyze_zip(level, nested_zip, path)
+            continue
+
         # Добавляем объект в отчёт
-        items.append(Item(str(root), str(path), size, time))
-    return items
+        yield Item(str(path), parts[-1], level, size, time)
 
 
-def analyze_folder(root:Path) -> list[Item]:
-    """Функция для анализа папки.
+@lru_cache(maxsize=4096)
+def _format_mtime(mtime:int) -> str:
+    """Форматирование времени изменения с точностью до секунды.
+
+    Результат кэшируется: у файлов из одной папки (копии, распакованные архивы)
+    время изменения часто совпадает.
 
     Args:
-        root (Path): Путь к анализируемой скриптом папке (из параметра --path командной строки).
+        mtime (int): Время изменения в секундах от начала эпохи.
+
+    Returns:
+        str: Время изменения в формате ISO 8601.
+    """
+    # Форматируем struct_time напрямую, без создания объекта datetime
+    t = localtime(mtime)
+    return '%04d-%02d-%02dT%02d:%02d:%02d' % (
+        t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec
+    )
+
+
+def _scan_dir(path:str) -> list[tuple[os.DirEntry, os.stat_result]]:
+    """Чтение содержимого одной папки (задача для пула потоков).
+
+    Args:
+        path (str): Путь к папке.
+
+    Returns:
+        list[tuple[os.DirEntry, os.stat_result]]: Объекты папки (кроме символических ссылок)
+            вместе с результатом stat().
+    """
+    result = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                # Игнорируем символические ссылки
+                if entry.is_symlink():
+                    continue
+                # Один вызов stat() на объект, результат кэшируется в DirEntry
+                result.append((entry, entry.stat()))
+    except PermissionError:
+        pass
+    # Сортируем объекты внутри папки: обход в глубину тогда сразу даёт отсортированное дерево
+    result.sort(key=lambda x: x[0].name.lower())
+    return result
+
+
+def _is_same_file(path:str, other:Path) -> bool:
+    """Проверка, указывают ли два пути на один и тот же файл.
+
+    Args:
+        path (str): Путь к объекту папки.
+        other (Path): Путь к файлу для сравнения (может не существовать).
 
     Returns:
-        list[Item]: Список элементов отчёта (объект: файл, папка или архив). 
+        bool: True, если это один и тот же файл.
     """
-    items = []
+    try:
+        return other.samefile(path)
+    except OSError:
+        return False
 
-    # Рекурсивный просмотр всех объектов в папке
-    for path in root.rglob('*'):
-        # Игнорируем символические ссылки
-        if path.is_symlink():
+
+def _walk(executor:ThreadPoolExecutor, scan:Future, level:int, exclude:dict[str, Path]) -> Iterator[Item]:
+    """Обход папки в глубину по результатам чтения из пула потоков.
+
+    Args:
+        executor (ThreadPoolExecutor): Пул потоков для чтения папок.
+        scan (Future): Задача чтения текущей папки (результат _scan_dir).
+        level (int): Уровень вложенности объектов папки.
+        exclude (dict[str, Path]): Файлы, не попадающие в отчёт (ключ - имя в нижнем регистре).
+
+    Yields:
+        Item: Элементы отчёта (объект: файл, папка или архив).
+    """
+    entries = scan.result()
+
+    # Сразу отправляем в пул чтение всех вложенных папок: они читаются,
+    # пока обрабатываются объекты текущей папки (тип берём из уже полученного stat())
+    subdirs = {
+        entry.path: executor.submit(_scan_dir, entry.path)
+        for entry, st in entries
+        if stat.S_ISDIR(st.st_mode)
+    }
+
+    for entry, st in entries:
+        # Пропускаем исключённые файлы (сам отчёт): сначала сравниваем имя, и только
+        # при совпадении проверяем, что это тот же файл
+        excluded = exclude.get(entry.name.lower())
+        if excluded is not None and _is_same_file(entry.path, excluded):
+            continue
+
+        size = st.st_size
+        time = _format_mtime(int(st.st_mtime))
+
+        # Если объект - папка, записываем ему size = 'FOLDER' и обходим её содержимое
+        if entry.path in subdirs:
+            yield Item(entry.path, entry.name, level, 'FOLDER', time)
+            yield from _walk(executor, subdirs.pop(entry.path), level + 1, exclude)
             continue
 
-        size = path.stat().st_size
-        time = datetime.fromtimestamp(path.stat().st_mtime).isoformat()
-        
-        # Если объект - папка, записываем ему size = 'FOLDER'
-        if path.is_dir():
-            size = 'FOLDER'
-        
         # Если объект - zip-архив, записываем ему size = 'ZIP'
-        if path.suffix.lower() == '.zip':
-            size = 'ZIP'
+        if entry.name.lower().endswith('.zip'):
+            yield Item(entry.path, entry.name, level, 'ZIP', time)
             # Открываем и читаем  zip-архив
-            with zipfile.ZipFile(path, 'r') as zipf:
-                items.extend(analyze_zip(root, zipf, path))
+            with zipfile.ZipFile(entry.path, 'r') as zipf:
+                yield from analyze_zip(level, zipf, Path(entry.path))
+            continue
 
         # Добавляем объект в отчёт
-        items.append(Item(str(root), str(path), size, time))        
-    
-    # Сортируем отчёт по пути (для исключения перемешивания c отчётоv из analyze_zip)
-    items.sort(key=lambda x: x.path.lower())
-    return items
+        yield Item(entry.path, entry.name, level, size, time)
+
+
+def analyze_folder(root:Path, exclude:Iterable[Path] = ()) -> Iterator[Item]:
+    """Функция для анализа папки.
+
+    Каждая папка читается отдельной задачей в пуле потоков: на время системных
+    вызовов GIL освобождается, поэтому задержки на сетевых и глубоких деревьях
+    перекрываются. Элементы отдаются по одному в порядке обхода в глубину (отсортированы
+    по имени внутри каждой папки), в памяти держатся только прочитанные, но ещё
+    не обработанные папки.
+
+    Args:
+        root (Path): Путь к анализируемой скриптом папке (из параметра --path командной строки).
+        exclude (Iterable[Path]): Файлы, которые не попадают в отчёт (например, сам отчёт).
+
+    Yields:
+        Item: Элементы отчёта (объект: файл, папка или архив).
+    """
+    exclude_by_name = {path.name.lower(): path for path in exclude}
+    with ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 4) as executor:
+        yield from _walk(executor, executor.submit(_scan_dir, str(root)), 0, exclude_by_name)
+
+
+# Управляющие символы, которые python-docx выводит отдельными элементами (как add_paragraph())
+_DOCX_CONTROL = {'\t': '<w:tab/>', '\n': '<w:br/>', '\r': '<w:br/>'}
+_DOCX_CONTROL_RE = re.compile('([\t\n\r])')
+
+
+def _docx_run(text:str) -> str:
+    """XML содержимого абзаца документа MS Word для строки.
+
+    Табуляция выводится как w:tab, переводы строки - как w:br, остальной текст
+    экранируется и выводится в w:t.
+
+    Args:
+        text (str): Текст абзаца.
+
+    Returns:
+        str: XML элемента w:r.
+    """
+    content = ''.join(
+        _DOCX_CONTROL.get(part) or f'<w:t xml:space="preserve">{escape(part)}</w:t>'
+        for part in _DOCX_CONTROL_RE.split(text)
+        if part
+    )
+    return f'<w:r>{content}</w:r>'
 
 
-def write_docx(folder_path:Path, report_path:Path, data:list[Item]):
+def write_docx(folder_path:Path, report_path:Path, data:Iterable[Item]):
     """Запись отчёта в документ MS Word (.docx).
 
     Args:
         folder_path (Path): Путь к анализируемой скриптом папке (из параметра --path командной строки).
         report_path (Path): Путь к файлу отчёта (из параметра --report командной строки).
-        data (list[Item]): Список элементов отчёта (объект: файл, папка или архив).
+        data (Iterable[Item]): Элементы отчёта (объект: файл, папка или архив).
     """
     doc = Document()
     doc.add_heading(f'Отчет о структуре файлов в папке {str(folder_path)}', 1)
 
-    # Выводим элементы отчёта в стрковом представлении
-    for d in data:
-        doc.add_paragraph(str(d))
+    # Выводим элементы отчёта в стрковом представлении: собираем XML всех абзацев
+    # одной строкой и разбираем его один раз вместо add_paragraph() на каждый элемент
+    paragraphs = ''.join(
+        f'<w:p>{_docx_run(str(d))}</w:p>' for d in data
+    )
+    body = doc.element.body
+    # Абзацы вставляем перед параметрами раздела (w:sectPr должен быть последним)
+    for p in parse_xml(f'<w:body {nsdecls("w")}>{paragraphs}</w:body>'):
+        body.sectPr.addprevious(p)
 
     doc.save(report_path)
 
 
-def write_xlsx(folder_path:Path, report_path:Path, data:list[Item]):
+def write_xlsx(folder_path:Path, report_path:Path, data:Iterable[Item]):
     """Запись отчёта в документ MS Excel (.xlsx).
 
+    Книга создаётся в режиме write_only: строки сразу сериализуются в XML и не
+    хранятся в памяти. Если установлен lxml (см. requirements.txt), openpyxl
+    использует его для записи XML автоматически, что дополнительно снижает
+    расход памяти и времени.
+
     Args:
         folder_path (Path): Путь к анализируемой скриптом папке (из параметра --path командной строки).
         report_path (Path): Путь к файлу отчёта (из параметра --report командной строки).
-        data (list[Item]): Список элементов отчёта (объект: файл, папка или архив).
+        data (Iterable[Item]): Элементы отчёта (объект: файл, папка или архив).
     """
-    wb = Workbook()
-    ws = wb.active
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
 
-    # Пишем заголовок в объёдинённых ячейках
-    ws['A1'] = f'Отчет о структуре файлов в папке {str(folder_path)}'
-    ws.merge_cells('A1:E1')
+    # Пишем заголовок первой строкой (объединение ячеек в режиме write_only недоступно)
+    ws.append([f'Отчет о структуре файлов в папке {str(folder_path)}'])
     ws.append([])
 
     # Выводим элементы отчёта с учётом уровня вложенности
@@ -180,22 +368,24 @@ def write_xlsx(folder_path:Path, report_path:Path, data:list[Item]):
     wb.save(report_path)
 
 
-def write_pdf(folder_path:Path, report_path:Path, data:list[Item]):
+def write_pdf(folder_path:Path, report_path:Path, data:Iterable[Item]):
     """Запись отчёта в документ PDF (.pdf).
 
     Args:
         folder_path (Path): Путь к анализируемой скриптом папке (из параметра --path командной строки).
         report_path (Path): Путь к файлу отчёта (из параметра --report командной строки).
-        data (list[Item]): Список элементов отчёта (объект: файл, папка или архив).
+        data (Iterable[Item]): Элементы отчёта (объект: файл, папка или архив).
     """
     pdf = SimpleDocTemplate(str(report_path), pagesize=A4)
     styles = getSampleStyleSheet()
 
-    # Регистрируем шрифт DejaVuSerif для корректного вывода кириллицйы
+    # Используем шрифт DejaVuSerif для корректного вывода кириллицйы
     styles['Normal'].fontName='DejaVuSerif'
     styles['Title'].fontName='DejaVuSerif'
-    # Файл DejaVuSerif.ttf должен быть обязательно
-    pdfmetrics.registerFont(TTFont('DejaVuSerif','DejaVuSerif.ttf', 'UTF-8'))
+    # Файл DejaVuSerif.ttf должен быть обязательно (если он не загрузился при импорте,
+    # повторная регистрация выдаст понятную ошибку)
+    if 'DejaVuSerif' not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont('DejaVuSerif','DejaVuSerif.ttf', 'UTF-8'))
 
     elements = []
 
@@ -215,55 +405,82 @@ def write_pdf(folder_path:Path, report_path:Path, data:list[Item]):
     pdf.build(elements)
 
 
-def write_csv(folder_path:Path, report_path:Path, data:list[Item]):
+# Символы, при которых значение в CSV нужно заключать в кавычки
+_CSV_SPECIAL = frozenset(';"\r\n')
+
+
+def _csv_row(row:list[str]) -> bytes:
+    """Строка CSV в кодировке UTF-8 с экранированием через csv.writer.
+
+    Args:
+        row (list[str]): Значения строки.
+
+    Returns:
+        bytes: Строка CSV с разделителем ';' и переводом строки CRLF.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter=';').writerow(row)
+    return buffer.getvalue().encode('utf-8')
+
+
+def write_csv(folder_path:Path, report_path:Path, data:Iterable[Item]):
     """Запись отчёта в файл CSV (.csv).
 
     Args:
         folder_path (Path): Путь к анализируемой скриптом папке (из параметра --path командной строки).
         report_path (Path): Путь к файлу отчёта (из параметра --report командной строки).
-        data (list[Item]): Список элементов отчёта (объект: файл, папка или архив).
+        data (Iterable[Item]): Элементы отчёта (объект: файл, папка или архив).
     """
-    with Path.open(report_path, 'w', encoding='utf-8-sig', newline='') as f:
-        writer = csv.writer(f, delimiter=';')
-        
-        writer.writerow([f'Отчет о структуре файлов в папке {str(folder_path)}'])
-        writer.writerow([])
+    with Path.open(report_path, 'wb') as f:
+        f.write(codecs.BOM_UTF8)
+        f.write(_csv_row([f'Отчет о структуре файлов в папке {str(folder_path)}']))
+        f.write(b'\r\n')
 
-        # Выводим элементы отчёта с учётом уровня вложенности
+        # Выводим элементы отчёта с учётом уровня вложенности. Строки без спецсимволов
+        # CSV собираем сразу в байты, остальные экранирует csv.writer
         for d in data:
-            row = [''] * d.level + [d.name, d.size, d.time]
-            writer.writerow(row)
+            if _CSV_SPECIAL.isdisjoint(d.name):
+                f.write(b';' * d.level + f'{d.name};{d.size};{d.time}\r\n'.encode('utf-8'))
+            else:
+                f.write(_csv_row([''] * d.level + [d.name, d.size, d.time]))
 
 
-def write_json(folder_path:Path, report_path:Path, data:list[Item]):
+def write_json(folder_path:Path, report_path:Path, data:Iterable[Item]):
     """Запись отчёта в файл JSON (.json).
 
     Args:
         folder_path (Path): Путь к анализируемой скриптом папке (из параметра --path командной строки).
         report_path (Path): Путь к файлу отчёта (из параметра --report командной строки).
-        data (list[Item]): Список элементов отчёта (объект: файл, папка или архив).
+        data (Iterable[Item]): Элементы отчёта (объект: файл, папка или архив).
     """
-    json_list = []
-
-    for i in data:
-        print(str(i))
-
-    for d in data:
-        json_list.append({
-            'level': d.level,
-            'name': d.name,
-            'size': d.size,
-            'time': d.time,
-            'path': d.path
-        })
-
-    output = {
-        'folder': str(folder_path),
-        'items': json_list
-    }
-
+    # Пишем элементы отчёта в файл по одному, не собирая промежуточный список
     with Path.open(report_path, 'w', encoding='utf-8') as f:
-        json.dump(output, f, ensure_ascii=False, indent=4)
+        f.write('{\n    "folder": %s,\n    "items": [' % json.dumps(str(folder_path), ensure_ascii=False))
+        sep = '\n        '
+        for d in data:
+            f.write(sep)
+            f.write(json.dumps({
+                'level': d.level,
+                'name': d.name,
+                'size': d.size,
+                'time': d.time,
+                'path': d.path
+            }, ensure_ascii=False))
+            sep = ',\n        '
+        f.write('\n    ]\n}\n')
+
+
+# Функции записи отчёта по расширению файла
+WRITERS = {
+    '.docx': write_docx,
+    '.xlsx': write_xlsx,
+    '.pdf': write_pdf,
+    '.csv': write_csv,
+    '.json': write_json,
+}
+
+# Форматы, которые пишутся построчно и могут принимать элементы прямо из генератора
+STREAMING = {'.csv', '.json', '.xlsx'}
 
 
 def main():
@@ -289,25 +506,29 @@ def main():
         print('Укажите корректный путь к анализируемой папке.')
         return
 
-    # Анализируем папку
-    data = analyze_folder(folder_path)
+    # Определяем функцию записи отчёта по расширению
+    writer = WRITERS.get(ex)
+    if writer is None:
+        print(f'Ошибка: указан некорректный формат отчёта: "{ex}".')
+        print('Укажите корректный формат отчёта (".csv", ".json", ".docx", ".xlsx", ".pdf") и попробуйте ещё раз.')
+        return
+
+    # Отчёт пишем во временный файл рядом с ним и заменяем им отчёт только после
+    # завершения записи: при ошибке во время обхода существующий отчёт не портится
+    tmp_path = report_path.with_name(f'.{report_path.name}.tmp')
+
+    # Анализируем папку (в потоковые отчёты элементы пишутся по мере обхода).
+    # Сам отчёт и его временный файл в отчёт не попадают
+    data = analyze_folder(folder_path, exclude=(report_path, tmp_path))
+    if ex not in STREAMING:
+        data = list(data)
 
     # Записываем отчёт с указанным расширением
-    match ex:
-        case '.docx':
-            write_docx(folder_path, report_path, data)
-        case '.xlsx':
-            write_xlsx(folder_path, report_path, data)
-        case '.pdf':
-            write_pdf(folder_path, report_path, data)
-        case '.csv':
-            write_csv(folder_path, report_path, data)
-        case '.json':
-            write_json(folder_path, report_path, data)
-        case _:
-            print(f'Ошибка: указан некорректный формат отчёта: "{ex}".')
-            print('Укажите корректный формат отчёта (".csv", ".json", ".docx", ".xlsx", ".pdf") и попробуйте ещё раз.')
-            return
+    try:
+        writer(folder_path, tmp_path, data)
+        tmp_path.replace(report_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
     print('Отчёт сформирован:', str(report_path))
 